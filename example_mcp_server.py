@@ -2,18 +2,127 @@
 """
 Example MCP Server - Using the official MCP SDK instead of fastmcp
 """
-import json
+import asyncio
+import functools
+import logging
 import os
 import sys
-from typing import Dict, Optional
+import time
+from collections import defaultdict
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional
+
+import orjson
+
+try:
+    import uvloop
+except ImportError:  # uvloop is not available on Windows
+    uvloop = None
 
 # Import the official MCP SDK
 from mcp.server import Server
-from mcp.types import Tool, Resource
+from mcp.types import TextContent, Tool, Resource
+from pydantic import AnyUrl
+
+logger = logging.getLogger(__name__)
 
 # Create an MCP server
 server = Server(name="Lightning MCP Example")
 
+def make_json_response(data: bytes) -> List[TextContent]:
+    """
+    Wrap already-encoded JSON as MCP text content.
+    
+    Args:
+        data: JSON document produced by orjson.dumps
+        
+    Returns:
+        Content list the transport can send without encoding the payload again
+    """
+    return [TextContent(type="text", text=data.decode())]
+
+class RawJSON(bytes):
+    """JSON document a handler has already encoded; the serializer shims pass it through."""
+
+def _encode(result) -> bytes:
+    """Encode a handler result with orjson unless it is already RawJSON."""
+    return result if isinstance(result, RawJSON) else orjson.dumps(result)
+
+def json_tool(handler):
+    """Serialize the result of a tool handler with orjson."""
+    @functools.wraps(handler)
+    async def wrapper(*args, **kwargs) -> List[TextContent]:
+        return make_json_response(_encode(await handler(*args, **kwargs)))
+    return wrapper
+
+def json_resource(handler):
+    """Serialize the result of a resource handler with orjson."""
+    @functools.wraps(handler)
+    async def wrapper(*args, **kwargs) -> str:
+        return _encode(await handler(*args, **kwargs)).decode()
+    return wrapper
+
+# Cumulative wall time (ns) and call count per tool handler, filled in by timed()
+_HANDLER_TIME_NS: Dict[str, int] = defaultdict(int)
+_HANDLER_CALLS: Dict[str, int] = defaultdict(int)
+
+def timed(name: str):
+    """Record how long each call to a tool handler takes (skipped under python -O)."""
+    def decorator(handler):
+        if not __debug__:
+            return handler
+        
+        @functools.wraps(handler)
+        async def wrapper(*args, **kwargs):
+            start = time.monotonic_ns()
+            try:
+                return await handler(*args, **kwargs)
+            finally:
+                _HANDLER_TIME_NS[name] += time.monotonic_ns() - start
+                _HANDLER_CALLS[name] += 1
+        return wrapper
+    return decorator
+
+async def log_handler_timings(interval: float = 60.0):
+    """Periodically log the cumulative time spent in each tool handler."""
+    while True:
+        await asyncio.sleep(interval)
+        for name, total_ns in sorted(_HANDLER_TIME_NS.items(), key=lambda item: -item[1]):
+            calls = _HANDLER_CALLS[name]
+            logger.info(
+                "Tool %s: %d calls, %.3f ms total, %.3f ms mean",
+                name, calls, total_ns / 1e6, total_ns / 1e6 / calls,
+            )
+
+# Static input schemas and payloads, encoded once at import time
+_CREATE_INVOICE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "amount_sat": {"type": "integer", "description": "Amount in satoshis"},
+        "memo": {"type": "string", "description": "Optional description for the invoice"},
+        "expiry": {"type": "integer", "description": "Expiry time in seconds (default: 1 hour)"},
+    },
+    "required": ["amount_sat"],
+}
+
+_GET_WALLET_BALANCE_SCHEMA = {
+    "type": "object",
+    "properties": {},
+}
+
+_NODE_INFO_JSON = RawJSON(orjson.dumps({
+    "node_pubkey": "simulated_pubkey",
+    "node_alias": "Example Lightning Node",
+    "num_active_channels": 5,
+    "num_inactive_channels": 1,
+    "version": "0.11.0",
+    "network": "mainnet",
+}))
+
+_WALLET_BALANCE_TEMPLATE = (
+    b'{"total_balance":%d,"confirmed_balance":%d,"unconfirmed_balance":%d}'
+)
+
 # Define functions for our lightning tools
 async def create_invoice_impl(amount_sat: int, memo: Optional[str] = None, expiry: int = 3600) -> Dict:
     """
@@ -28,7 +137,7 @@ async def create_invoice_impl(amount_sat: int, memo: Optional[str] = None, expir
         Dictionary with invoice details including payment_request (bolt11 invoice)
     """
     # Simple implementation for demonstration
-    print(f"Creating invoice for {amount_sat} sats with memo: {memo}", file=sys.stderr)
+    logger.debug("Creating invoice for %s sats with memo: %s", amount_sat, memo)
     
     # Return a simulated invoice
     return {
@@ -39,86 +148,82 @@ async def create_invoice_impl(amount_sat: int, memo: Optional[str] = None, expir
         "expiry": expiry,
     }
 
-async def get_wallet_balance_impl() -> Dict:
+async def get_wallet_balance_impl() -> RawJSON:
     """
     Get the current wallet balance.
     
     Returns:
-        Dictionary with balance information
+        JSON-encoded balance information
     """
     # Simple implementation for demonstration
-    print("Getting wallet balance", file=sys.stderr)
+    logger.debug("Getting wallet balance")
     
     # Return a simulated balance
-    return {
-        "total_balance": 1000000,
-        "confirmed_balance": 950000,
-        "unconfirmed_balance": 50000,
-    }
+    confirmed = 950000
+    unconfirmed = 50000
+    return RawJSON(_WALLET_BALANCE_TEMPLATE % (confirmed + unconfirmed, confirmed, unconfirmed))
 
-async def get_node_info_impl() -> Dict:
+async def get_node_info_impl() -> RawJSON:
     """
     Get information about the Lightning node.
     
     Returns:
-        Dictionary with node information
+        JSON-encoded node information, encoded once at import time
     """
-    return {
-        "node_pubkey": "simulated_pubkey",
-        "node_alias": "Example Lightning Node",
-        "num_active_channels": 5,
-        "num_inactive_channels": 1,
-        "version": "0.11.0",
-        "network": "mainnet",
-    }
+    return _NODE_INFO_JSON
 
-# Register the tools with the server
-async def register_tools():
-    # Create invoice tool
-    invoice_tool = Tool(
+# Tool and resource descriptions are static, so build them once at import time
+TOOL_REGISTRY: Mapping[str, Tool] = MappingProxyType({
+    "create_invoice": Tool(
         name="create_invoice",
         description="Create a Lightning Network invoice for the specified amount",
-        inputSchema={
-            "type": "object",
-            "properties": {
-                "amount_sat": {"type": "integer", "description": "Amount in satoshis"},
-                "memo": {"type": "string", "description": "Optional description for the invoice"},
-                "expiry": {"type": "integer", "description": "Expiry time in seconds (default: 1 hour)"},
-            },
-            "required": ["amount_sat"],
-        },
-    )
-    
-    # Wallet balance tool
-    balance_tool = Tool(
+        inputSchema=_CREATE_INVOICE_SCHEMA,
+    ),
+    "get_wallet_balance": Tool(
         name="get_wallet_balance",
         description="Get the current wallet balance",
-        inputSchema={
-            "type": "object",
-            "properties": {},
-        },
-    )
-    
-    # Register the tools
-    server.register_tool_handler("create_invoice", create_invoice_impl)
-    server.register_tool(invoice_tool)
-    
-    server.register_tool_handler("get_wallet_balance", get_wallet_balance_impl)
-    server.register_tool(balance_tool)
-    
-    # Register node info resource
-    node_info_resource = Resource(
-        uri="resource://lightning/info",
+        inputSchema=_GET_WALLET_BALANCE_SCHEMA,
+    ),
+})
+
+RESOURCE_REGISTRY: Mapping[str, Resource] = MappingProxyType({
+    "resource://lightning/info": Resource(
+        uri=AnyUrl("resource://lightning/info"),
         name="Lightning Node Information",
         description="Basic information about the Lightning node",
         mimeType="application/json",
-    )
+    ),
+})
+
+TOOL_HANDLERS = MappingProxyType({
+    "create_invoice": timed("create_invoice")(json_tool(create_invoice_impl)),
+    "get_wallet_balance": timed("get_wallet_balance")(json_tool(get_wallet_balance_impl)),
+})
+
+RESOURCE_HANDLERS = MappingProxyType({
+    "resource://lightning/info": json_resource(get_node_info_impl),
+})
+
+# Register the tools with the server
+async def register_tools():
+    for name, tool in TOOL_REGISTRY.items():
+        server.register_tool_handler(name, TOOL_HANDLERS[name])
+        server.register_tool(tool)
     
-    server.register_resource_handler("resource://lightning/info", get_node_info_impl)
-    server.register_resource(node_info_resource)
+    for uri, resource in RESOURCE_REGISTRY.items():
+        server.register_resource_handler(uri, RESOURCE_HANDLERS[uri])
+        server.register_resource(resource)
+
+async def main(host: str, port: int):
+    """Register tools and resources, then serve them over SSE on one event loop."""
+    await register_tools()
+    timings_task = asyncio.create_task(log_handler_timings())
+    try:
+        await server.run_sse_server(host=host, port=port)
+    finally:
+        timings_task.cancel()
 
 if __name__ == "__main__":
-    import asyncio
     import argparse
     
     parser = argparse.ArgumentParser(description="Lightning MCP Example Server")
@@ -129,8 +234,15 @@ if __name__ == "__main__":
     print(f"Starting Lightning MCP Example server on {args.host}:{args.port}", file=sys.stderr)
     print("Use Ctrl+C to stop the server", file=sys.stderr)
     
-    # Set up tools and resources
-    asyncio.run(register_tools())
+    # Show the per-request handler timings logged at INFO
+    logging.basicConfig(level=logging.INFO)
     
-    # Run the server using SSE transport
-    asyncio.run(server.run_sse_server(host=args.host, port=args.port)) 
\ No newline at end of file
+    # Use libuv's event loop when it is available on this platform
+    if uvloop is None:
+        asyncio.run(main(args.host, args.port))
+    elif sys.version_info >= (3, 11):
+        with asyncio.Runner(loop_factory=uvloop.new_event_loop) as runner:
+            runner.run(main(args.host, args.port))
+    else:
+        uvloop.install()
+        asyncio.run(main(args.host, args.port))
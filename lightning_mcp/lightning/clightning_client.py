@@ -2,18 +2,227 @@
 """
 C-Lightning Client - Class for interfacing with c-lightning RPC.
 """
-import os
-import sys
+import asyncio
+import itertools
 import json
+import logging
+import os
 import time
-import hashlib
 import random
-from typing import Dict, List, Optional, Union
+from array import array
+from hashlib import sha256
+from typing import Any, Dict, List, MutableSequence, Optional, Tuple, Union
 from pathlib import Path
 
+import orjson
+
+from lightning_mcp.utils.placeholder import CHANNEL_FIELDS, LNBC_RE, now, simulated_status
+
+logger = logging.getLogger(__name__)
+
+# Upper bound for a single RPC response (listchannels on mainnet runs to megabytes)
+_RPC_READ_LIMIT = 64 * 1024 * 1024
+
+# list_channels_columnar stores these fields as int64 columns
+_CHANNEL_AMOUNT_FIELDS = frozenset(("capacity", "local_balance", "remote_balance", "commit_fee"))
+
+def _new_channel_columns() -> Dict[str, MutableSequence[Any]]:
+    """Create empty columns for list_channels_columnar."""
+    columns: Dict[str, MutableSequence[Any]] = {}
+    for field in CHANNEL_FIELDS:
+        if field in _CHANNEL_AMOUNT_FIELDS:
+            columns[field] = array("q")
+        else:
+            columns[field] = []
+    return columns
+
+class RpcError(Exception):
+    """Error returned by c-lightning for a JSON-RPC request."""
+    
+    def __init__(self, method: str, error: Dict):
+        super().__init__(f"c-lightning {method} failed: {error.get('message', error)}")
+        self.method = method
+        self.error = error
+
+class _RpcConnection:
+    """Persistent JSON-RPC connection to a c-lightning unix socket."""
+    
+    def __init__(self, socket_path: str):
+        """
+        Initialize the connection; the socket is opened on first use, and
+        reopened when used from a different event loop.
+        
+        Args:
+            socket_path: Path to the lightning-rpc socket file
+        """
+        self.socket_path = socket_path
+        # Number of clients sharing this connection through _CONNECTIONS
+        self.clients = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._read_task: Optional[asyncio.Task] = None
+        self._futures: Dict[int, asyncio.Future] = {}
+        self._ids = itertools.count(1)
+        self._open_lock = asyncio.Lock()
+        self._pending: List[Tuple[int, bytes]] = []
+        self._flush_task: Optional[asyncio.Task] = None
+    
+    def _bind(self, loop: Optional[asyncio.AbstractEventLoop]) -> None:
+        """
+        Drop the streams, reader task and pending calls and bind to a new loop.
+        
+        They all belong to the loop that created them and cannot be used, or
+        even closed, from another one, so they are left to be collected; an
+        old loop that is still running closes its own socket.
+        
+        Args:
+            loop: The event loop the connection is used from next, or None
+        """
+        if self._writer is not None and self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._writer.close)
+        self._loop = loop
+        self._reader = None
+        self._writer = None
+        self._read_task = None
+        self._futures = {}
+        self._open_lock = asyncio.Lock()
+        self._pending = []
+        self._flush_task = None
+    
+    async def _ensure_open(self) -> asyncio.StreamWriter:
+        """Open the socket and start the response reader if needed."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._bind(loop)
+        if self._writer is None or self._writer.is_closing():
+            async with self._open_lock:
+                if self._writer is None or self._writer.is_closing():
+                    self._reader, self._writer = await asyncio.open_unix_connection(
+                        self.socket_path, limit=_RPC_READ_LIMIT
+                    )
+                    self._read_task = asyncio.create_task(
+                        self._read_responses(self._reader, self._writer)
+                    )
+        return self._writer
+    
+    async def call(self, method: str, params: Dict) -> Dict:
+        """
+        Send a request and wait for the response with the matching id.
+        
+        Requests made in the same event loop iteration are coalesced into a
+        single socket write, and every caller waits for that write to drain.
+        
+        Args:
+            method: The RPC method name
+            params: Named parameters for the method
+            
+        Returns:
+            The result object of the response
+            
+        Raises:
+            RpcError: If c-lightning returns an error for the request
+            ConnectionError: If the socket closes before the response arrives
+        """
+        await self._ensure_open()
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._futures[request_id] = future
+        self._pending.append((request_id, orjson.dumps({
+            "jsonrpc": "2.0",
+            "id": request_id,
+            "method": method,
+            "params": params,
+        })))
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush())
+        # Shielded so one cancelled caller does not cancel the write for the others
+        await asyncio.shield(self._flush_task)
+        
+        response = await future
+        if "error" in response:
+            raise RpcError(method, response["error"])
+        return response.get("result", {})
+    
+    async def _flush(self) -> None:
+        """
+        Write every request queued during this loop iteration in one call and
+        wait for it to drain.
+        
+        Requests that cannot be written fail with ConnectionError instead of
+        waiting for a response that will never come.
+        """
+        self._flush_task = None
+        pending, self._pending = self._pending, []
+        try:
+            if self._writer is None or self._writer.is_closing():
+                raise ConnectionError("c-lightning connection closed")
+            self._writer.write(b"".join(frame for _, frame in pending))
+            await self._writer.drain()
+        except ConnectionError as e:
+            for request_id, _ in pending:
+                future = self._futures.pop(request_id, None)
+                if future is not None and not future.done():
+                    future.set_exception(e)
+    
+    async def _read_responses(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """
+        Route each response frame to the future waiting on its id.
+        
+        Args:
+            reader: Stream of the socket this task reads from
+            writer: Writer of the same socket, closed when reading stops
+        """
+        error: Exception
+        try:
+            while True:
+                # c-lightning terminates every response with a blank line
+                frame = await reader.readuntil(b"\n\n")
+                response = orjson.loads(frame)
+                future = self._futures.pop(response.get("id"), None)
+                if future is not None and not future.done():
+                    future.set_result(response)
+        except (asyncio.IncompleteReadError, ConnectionError) as e:
+            error = ConnectionError(f"c-lightning connection closed: {e}")
+        except Exception as e:
+            error = e
+        
+        for future in self._futures.values():
+            if not future.done():
+                future.set_exception(error)
+        self._futures.clear()
+        writer.close()
+    
+    async def close(self) -> None:
+        """Close the socket, stop the response reader and fail pending calls."""
+        if self._loop is not asyncio.get_running_loop():
+            self._bind(None)
+            return
+        if self._read_task is not None:
+            self._read_task.cancel()
+            self._read_task = None
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        for future in self._futures.values():
+            if not future.done():
+                future.set_exception(ConnectionError("c-lightning connection closed"))
+        self._futures.clear()
+
+# Connections shared by every client for the same node, keyed by (socket_path, network);
+# a connection is closed and removed when its last client closes
+_CONNECTIONS: Dict[Tuple[str, str], _RpcConnection] = {}
+
 class CLightningClient:
     """Client for interacting with c-lightning via RPC."""
     
+    __slots__ = ("socket_path", "network", "_conn")
+    
+    # Shared connection to the node, None once this client is closed
+    _conn: Optional[_RpcConnection]
+    
     def __init__(
         self, 
         socket_path: str,
@@ -26,7 +235,9 @@ class CLightningClient:
             socket_path: Path to the lightning-rpc socket file
             network: Bitcoin network (mainnet, testnet, regtest)
         """
-        self.socket_path = socket_path
+        # Expanded once here so reconnects skip it and "~/..." and absolute
+        # spellings of the same socket share one pooled connection
+        self.socket_path = os.path.expanduser(socket_path)
         self.network = network
         
         # Connect to the c-lightning node
@@ -34,35 +245,56 @@ class CLightningClient:
     
     def _setup_connection(self) -> None:
         """Set up the connection to c-lightning."""
-        # In a real implementation, we would validate the socket_path exists
-        # and try to establish a connection
-        print(f"Connecting to c-lightning node at {self.socket_path} on {self.network}", file=sys.stderr)
-        
-        # For a real implementation, we would use lightning-rpc directly or a library like pyln-client:
-        # from pyln.client import LightningRpc
-        # self.rpc = LightningRpc(self.socket_path)
+        # The socket is opened lazily by the first RPC call, inside the event loop,
+        # and shared with every other client talking to the same node
+        logger.debug("Connecting to c-lightning node at %s on %s", self.socket_path, self.network)
+        key = (self.socket_path, self.network)
+        conn = _CONNECTIONS.get(key)
+        if conn is None:
+            conn = _CONNECTIONS.setdefault(key, _RpcConnection(self.socket_path))
+        conn.clients += 1
+        self._conn = conn
     
-    def _call_method(self, method: str, **kwargs) -> Dict:
+    async def _call_method(self, method: str, **kwargs) -> Dict:
         """
         Call a method on the c-lightning RPC interface.
         
+        Concurrent calls share one socket and are matched to their responses
+        by JSON-RPC id, so they do not wait on each other.
+        
         Args:
             method: The RPC method name
             **kwargs: Arguments to pass to the method
             
         Returns:
             Response dictionary
+            
+        Raises:
+            ConnectionError: If the client has been closed
         """
-        # In a real implementation, we would call the RPC method:
-        # return self.rpc.call(method, kwargs)
-        
-        # For the placeholder, just log the call
-        print(f"Calling c-lightning method {method} with args {kwargs}", file=sys.stderr)
+        logger.debug("Calling c-lightning method %s with args %s", method, kwargs)
+        if self._conn is None:
+            raise ConnectionError("c-lightning client is closed")
+        return await self._conn.call(method, kwargs)
+    
+    async def close(self) -> None:
+        """
+        Release this client's share of the node connection.
         
-        # Return a simulated response
-        return {"simulated": True, "method": method, "args": kwargs}
+        The socket stays open for the other clients of the same node and is
+        closed when the last of them closes.
+        """
+        conn, self._conn = self._conn, None
+        if conn is None:
+            return
+        conn.clients -= 1
+        if conn.clients == 0:
+            key = (self.socket_path, self.network)
+            if _CONNECTIONS.get(key) is conn:
+                del _CONNECTIONS[key]
+            await conn.close()
     
-    def create_invoice(
+    async def create_invoice(
         self, 
         amount_sat: int, 
         memo: Optional[str] = None, 
@@ -80,24 +312,26 @@ class CLightningClient:
             Dictionary with invoice details
         """
         # In a real implementation:
-        # return self._call_method("invoice", 
+        # return await self._call_method("invoice", 
         #                          msatoshi=amount_sat*1000, 
         #                          label=f"invoice-{int(time.time())}", 
         #                          description=memo or "")
         
         # Placeholder implementation for development
-        fake_hash = hashlib.sha256(f"{amount_sat}:{memo}:{time.time()}".encode()).hexdigest()
+        fake_hash = sha256(
+            b"%d:%s:%d" % (amount_sat, (memo or "").encode(), time.monotonic_ns())
+        ).digest().hex()
         
         return {
             "payment_hash": fake_hash,
             "payment_request": f"lnbc{amount_sat}p1fakelnxyz",
-            "add_index": int(time.time()),
+            "add_index": now(),
             "amount_sat": amount_sat,
             "memo": memo or "",
             "expiry": expiry,
         }
     
-    def decode_invoice(self, payment_request: str) -> Dict:
+    async def decode_invoice(self, payment_request: str) -> Dict:
         """
         Decode a BOLT11 invoice.
         
@@ -108,30 +342,23 @@ class CLightningClient:
             Dictionary with decoded invoice details
         """
         # In a real implementation:
-        # return self._call_method("decodepay", bolt11=payment_request)
+        # return await self._call_method("decodepay", bolt11=payment_request)
         
         # Placeholder implementation
-        try:
-            # Extract amount from lnbcXXXp1fakelnxyz format
-            parts = payment_request.split("lnbc")
-            if len(parts) > 1:
-                amount_part = parts[1].split("p1fakelnxyz")[0]
-                amount_sat = int(amount_part)
-            else:
-                amount_sat = 0
-        except:
-            amount_sat = 0
-            
+        # Extract amount from lnbcXXXp1fakelnxyz format
+        match = LNBC_RE.match(payment_request)
+        amount_sat = int(match.group(1)) if match else 0
+        
         return {
             "payment_hash": "fakehash",
             "amount_sat": amount_sat,
             "destination": "fakepubkey",
             "description": "Fake invoice for development",
             "expiry": 3600,
-            "timestamp": int(time.time()),
+            "timestamp": now(),
         }
     
-    def pay_invoice(self, payment_request: str, max_fee_sat: Optional[int] = None) -> Dict:
+    async def pay_invoice(self, payment_request: str, max_fee_sat: Optional[int] = None) -> Dict:
         """
         Pay a Lightning invoice.
         
@@ -146,7 +373,7 @@ class CLightningClient:
         # params = {"bolt11": payment_request}
         # if max_fee_sat is not None:
         #     params["maxfee"] = max_fee_sat * 1000  # Convert to msats
-        # result = self._call_method("pay", **params)
+        # result = await self._call_method("pay", **params)
         # return {
         #     "payment_hash": result.get("payment_hash"),
         #     "payment_preimage": result.get("payment_preimage"),
@@ -158,27 +385,29 @@ class CLightningClient:
         # }
         
         # Placeholder implementation
-        decoded = self.decode_invoice(payment_request)
+        decoded = await self.decode_invoice(payment_request)
+        payment_hash = decoded.get("payment_hash", "fakehash")
+        amount_sat = decoded.get("amount_sat", 0)
         
         # Simulate a successful payment
         if random.random() < 0.1:
             return {
-                "payment_hash": decoded.get("payment_hash", "fakehash"),
+                "payment_hash": payment_hash,
                 "status": "FAILED",
                 "failure_reason": "NO_ROUTE",
             }
         
         return {
-            "payment_hash": decoded.get("payment_hash", "fakehash"),
-            "payment_preimage": hashlib.sha256(f"preimage:{time.time()}".encode()).hexdigest(),
+            "payment_hash": payment_hash,
+            "payment_preimage": sha256(b"preimage:%d" % time.monotonic_ns()).digest().hex(),
             "payment_route": {
-                "total_amt": decoded.get("amount_sat", 0),
-                "total_fees": max_fee_sat or int(decoded.get("amount_sat", 0) * 0.01),  # 1% fee
+                "total_amt": amount_sat,
+                "total_fees": max_fee_sat if max_fee_sat is not None else amount_sat // 100,  # 1% fee
             },
             "status": "SUCCEEDED",
         }
     
-    def get_payment_status(self, payment_hash: str) -> Dict:
+    async def get_payment_status(self, payment_hash: str) -> Dict:
         """
         Get the status of a payment.
         
@@ -189,7 +418,7 @@ class CLightningClient:
             Dictionary with payment status
         """
         # In a real implementation:
-        # payments = self._call_method("listpays", payment_hash=payment_hash)
+        # payments = await self._call_method("listpays", payment_hash=payment_hash)
         # if "pays" in payments and payments["pays"]:
         #     payment = payments["pays"][0]
         #     return {
@@ -197,24 +426,22 @@ class CLightningClient:
         #         "status": "SUCCEEDED" if payment.get("status") == "complete" else "FAILED",
         #         "value_sat": payment.get("amount_msat", 0) // 1000,
         #         "fee_sat": payment.get("fee_msat", 0) // 1000,
-        #         "creation_time_ns": payment.get("created_at", int(time.time())) * 1e9,
+        #         "creation_time_ns": payment.get("created_at", int(time.time())) * 1_000_000_000,
         #     }
         # return {"error": "Payment not found"}
         
         # Placeholder implementation
-        statuses = ["SUCCEEDED", "FAILED", "IN_FLIGHT"]
-        weights = [0.8, 0.1, 0.1]
-        status = random.choices(statuses, weights=weights, k=1)[0]
+        status = simulated_status(random.random())
         
         return {
             "payment_hash": payment_hash,
             "status": status,
             "value_sat": random.randint(1000, 100000),
             "fee_sat": random.randint(1, 100),
-            "creation_time_ns": int(time.time() * 1e9),
+            "creation_time_ns": time.time_ns(),
         }
     
-    def get_wallet_balance(self) -> Dict:
+    async def get_wallet_balance(self) -> Dict:
         """
         Get the wallet balance.
         
@@ -222,7 +449,7 @@ class CLightningClient:
             Dictionary with balance information
         """
         # In a real implementation:
-        # funds = self._call_method("listfunds")
+        # funds = await self._call_method("listfunds")
         # total_confirmed = sum(output["value"] for output in funds.get("outputs", []) if output.get("status") == "confirmed")
         # total_unconfirmed = sum(output["value"] for output in funds.get("outputs", []) if output.get("status") != "confirmed")
         # return {
@@ -241,7 +468,7 @@ class CLightningClient:
             "unconfirmed_balance": unconfirmed,
         }
     
-    def get_channel_balance(self) -> Dict:
+    async def get_channel_balance(self) -> Dict:
         """
         Get the channel balance.
         
@@ -249,7 +476,7 @@ class CLightningClient:
             Dictionary with channel balance information
         """
         # In a real implementation:
-        # funds = self._call_method("listfunds")
+        # funds = await self._call_method("listfunds")
         # channels = funds.get("channels", [])
         # balance = sum(channel["our_amount_msat"] // 1000 for channel in channels if channel.get("state") == "CHANNELD_NORMAL")
         # pending = sum(channel["our_amount_msat"] // 1000 for channel in channels if channel.get("state") != "CHANNELD_NORMAL")
@@ -267,52 +494,62 @@ class CLightningClient:
             "pending_open_balance": pending,
         }
     
-    def list_channels(self) -> List[Dict]:
+    async def list_channels_columnar(self) -> Dict[str, MutableSequence[Any]]:
         """
-        List all active channels.
+        List all active channels as parallel columns, one per channel field.
+        
+        The amount columns are array objects, which orjson cannot serialize, so
+        the result must not be passed to to_json; use list_channels for results
+        returned to MCP clients.
         
         Returns:
-            List of channel dictionaries
+            Dictionary mapping each channel field to its values; the amount
+            fields are int64 arrays so totals can be summed over a C buffer
         """
         # In a real implementation:
-        # channels = self._call_method("listchannels")
-        # result = []
+        # channels = await self._call_method("listchannels")
+        # columns = _new_channel_columns()
         # for channel in channels.get("channels", []):
-        #     result.append({
-        #         "active": channel.get("active", False),
-        #         "remote_pubkey": channel.get("destination", ""),
-        #         "channel_point": f"{channel.get('short_channel_id', '')}",
-        #         "chan_id": channel.get("short_channel_id", ""),
-        #         "capacity": channel.get("satoshis", 0),
-        #         "local_balance": channel.get("our_amount_msat", 0) // 1000,
-        #         "remote_balance": channel.get("their_amount_msat", 0) // 1000,
-        #         "commit_fee": channel.get("fee_base_msat", 0) // 1000,
-        #         "private": not channel.get("public", True),
-        #     })
-        # return result
+        #     columns["active"].append(channel.get("active", False))
+        #     columns["remote_pubkey"].append(channel.get("destination", ""))
+        #     columns["channel_point"].append(f"{channel.get('short_channel_id', '')}")
+        #     columns["chan_id"].append(channel.get("short_channel_id", ""))
+        #     columns["capacity"].append(channel.get("satoshis", 0))
+        #     columns["local_balance"].append(channel.get("our_amount_msat", 0) // 1000)
+        #     columns["remote_balance"].append(channel.get("their_amount_msat", 0) // 1000)
+        #     columns["commit_fee"].append(channel.get("fee_base_msat", 0) // 1000)
+        #     columns["private"].append(not channel.get("public", True))
+        # return columns
         
         # Placeholder implementation
-        result = []
+        columns = _new_channel_columns()
         for i in range(random.randint(1, 5)):
             capacity = random.randint(100000, 10000000)
             local_balance = random.randint(0, capacity)
-            remote_balance = capacity - local_balance
             
-            result.append({
-                "active": random.random() > 0.1,  # 90% chance of being active
-                "remote_pubkey": f"fakepubkey{i}",
-                "channel_point": f"faketxid:{i}",
-                "chan_id": str(random.randint(100000, 999999)),
-                "capacity": capacity,
-                "local_balance": local_balance,
-                "remote_balance": remote_balance,
-                "commit_fee": random.randint(100, 1000),
-                "private": random.random() > 0.8,  # 20% chance of being private
-            })
-        
-        return result
+            columns["active"].append(random.random() > 0.1)  # 90% chance of being active
+            columns["remote_pubkey"].append(f"fakepubkey{i}")
+            columns["channel_point"].append(f"faketxid:{i}")
+            columns["chan_id"].append(str(random.randint(100000, 999999)))
+            columns["capacity"].append(capacity)
+            columns["local_balance"].append(local_balance)
+            columns["remote_balance"].append(capacity - local_balance)
+            columns["commit_fee"].append(random.randint(100, 1000))
+            columns["private"].append(random.random() > 0.8)  # 20% chance of being private
+        
+        return columns
+    
+    async def list_channels(self) -> List[Dict]:
+        """
+        List all active channels.
+        
+        Returns:
+            List of channel dictionaries
+        """
+        columns = await self.list_channels_columnar()
+        return [dict(zip(columns, row)) for row in zip(*columns.values())]
     
-    def open_channel(
+    async def open_channel(
         self,
         peer_pubkey: str,
         local_amt_sat: int,
@@ -342,7 +579,7 @@ class CLightningClient:
         #     params["announce"] = False
         # 
         # try:
-        #     result = self._call_method("fundchannel", **params)
+        #     result = await self._call_method("fundchannel", **params)
         #     return {
         #         "funding_txid": result.get("txid", ""),
         #         "output_index": result.get("outnum", 0),
@@ -356,12 +593,12 @@ class CLightningClient:
             return {"error": "Failed to open channel: peer not reachable"}
         
         return {
-            "funding_txid": f"fakefundingtxid{int(time.time())}",
+            "funding_txid": f"fakefundingtxid{now()}",
             "output_index": 0,
             "status": "PENDING_OPEN",
         }
     
-    def close_channel(
+    async def close_channel(
         self,
         channel_point: str,
         force: bool = False,
@@ -382,7 +619,7 @@ class CLightningClient:
         #     if ":" in channel_point:
         #         # If format is txid:index
         #         funding_txid, output_index = channel_point.split(':')
-        #         channels = self._call_method("listfunds").get("channels", [])
+        #         channels = (await self._call_method("listfunds")).get("channels", [])
         #         channel_id = None
         #         
         #         # Find the matching channel
@@ -403,7 +640,7 @@ class CLightningClient:
         #     }
         #     params = {k: v for k, v in params.items() if v is not None}
         #     
-        #     result = self._call_method("close", **params)
+        #     result = await self._call_method("close", **params)
         #     return {
         #         "closing_txid": result.get("txid", ""),
         #         "status": "PENDING_FORCE_CLOSE" if force else "PENDING_CLOSE",
@@ -416,6 +653,6 @@ class CLightningClient:
             return {"error": "Failed to close channel: channel not found"}
         
         return {
-            "closing_txid": f"fakeclosingtxid{int(time.time())}",
+            "closing_txid": f"fakeclosingtxid{now()}",
             "status": "PENDING_FORCE_CLOSE" if force else "PENDING_CLOSE",
         } 
\ No newline at end of file
@@ -2,10 +2,15 @@
 """
 LND Client - Class for interfacing with a Lightning Network Daemon (LND).
 """
-import codecs
+import itertools
+import logging
+import operator
 import os
-import sys
-from typing import Dict, List, Optional, Union
+import random
+import time
+from functools import lru_cache
+from hashlib import sha256
+from typing import Any, Dict, List, Optional, Union
 
 import grpc
 
@@ -17,6 +22,67 @@ import grpc
 # import router_pb2 as router
 # import router_pb2_grpc as routerrpc
 
+from lightning_mcp.utils.placeholder import CHANNEL_FIELDS, LNBC_RE, now, simulated_status
+
+logger = logging.getLogger(__name__)
+
+# Parameterless requests are identical on every call, so build them once and
+# share them; they are only ever serialized, never mutated
+# _REQ_LIST_PAYMENTS = ln.ListPaymentsRequest(include_incomplete=True)
+# _REQ_WALLET_BALANCE = ln.WalletBalanceRequest()
+# _REQ_CHANNEL_BALANCE = ln.ChannelBalanceRequest()
+# _REQ_LIST_CHANNELS = ln.ListChannelsRequest()
+# _REQ_LIST_PEERS = ln.ListPeersRequest()
+
+# Number of gRPC channels concurrent RPCs are spread across
+_CHANNEL_POOL_SIZE = 4
+
+# Options for every pooled channel. Keepalive pings detect a dead connection
+# during long calls, and disabling the client idle timeout keeps channels
+# connected between bursts instead of reconnecting after 30 idle minutes. The
+# receive limit fits large replies such as ListChannels, and a local subchannel
+# pool stops gRPC from collapsing the channels onto one connection.
+_GRPC_CHANNEL_OPTIONS = [
+    ("grpc.keepalive_time_ms", 30000),
+    ("grpc.keepalive_timeout_ms", 10000),
+    ("grpc.http2.max_pings_without_data", 0),
+    ("grpc.client_idle_timeout_ms", 2**31 - 1),
+    ("grpc.max_receive_message_length", 50 * 1024 * 1024),
+    ("grpc.use_local_subchannel_pool", 1),
+]
+
+# Reads the CHANNEL_FIELDS of an ln.Channel in one C-level call
+_get_channel_fields = operator.attrgetter(*CHANNEL_FIELDS)
+
+@lru_cache(maxsize=8)
+def _load_credentials(tls_cert_path: str, macaroon_path: str) -> grpc.ChannelCredentials:
+    """
+    Build combined TLS and macaroon credentials for LND.
+    
+    The result depends only on the two paths, so it is cached and shared by
+    every client and reconnect that uses the same files.
+    
+    Args:
+        tls_cert_path: Path to the TLS certificate
+        macaroon_path: Path to the macaroon file for authentication
+        
+    Returns:
+        Channel credentials combining SSL and the macaroon metadata
+    """
+    # LND's certificate uses an ECDSA key
+    os.environ["GRPC_SSL_CIPHER_SUITES"] = "HIGH+ECDSA"
+    
+    with open(os.path.expanduser(tls_cert_path), "rb") as f:
+        ssl_creds = grpc.ssl_channel_credentials(f.read())
+    
+    with open(os.path.expanduser(macaroon_path), "rb") as f:
+        macaroon = f.read().hex()
+    auth_creds = grpc.metadata_call_credentials(
+        lambda context, callback: callback([("macaroon", macaroon)], None)
+    )
+    
+    return grpc.composite_channel_credentials(ssl_creds, auth_creds)
+
 class LNDClient:
     """Client for interacting with LND via gRPC."""
     
@@ -49,28 +115,34 @@ class LNDClient:
         """Set up the gRPC connection to LND."""
         # This is a placeholder for the actual implementation
         # In a real implementation, this would:
-        # 1. Set up the environment for ECDSA ciphers
-        # 2. Read the TLS certificate
-        # 3. Create the SSL credentials
-        # 4. Read the macaroon
-        # 5. Create the metadata callback
-        # 6. Create the channel with combined credentials
-        # 7. Create the stubs for various services
-        
-        # os.environ["GRPC_SSL_CIPHER_SUITES"] = 'HIGH+ECDSA'
-        # cert = open(self.tls_cert_path, 'rb').read()
-        # ssl_creds = grpc.ssl_channel_credentials(cert)
-        # macaroon = codecs.decode(open(self.macaroon_path, 'rb').read(), 'hex')
-        # auth_creds = grpc.metadata_call_credentials(
-        #     lambda context, callback: callback([('macaroon', macaroon)], None)
-        # )
-        # combined_creds = grpc.composite_channel_credentials(ssl_creds, auth_creds)
-        # self.channel = grpc.secure_channel(self.rpc_server, combined_creds)
-        # self.stub = lnrpc.LightningStub(self.channel)
-        # self.router_stub = routerrpc.RouterStub(self.channel)
+        # 1. Load the (cached) TLS and macaroon credentials
+        # 2. Create a pool of channels with combined credentials
+        # 3. Create the stubs for various services on each channel
+        
+        # combined_creds = _load_credentials(self.tls_cert_path, self.macaroon_path)
+        # self._channels = [
+        #     grpc.secure_channel(self.rpc_server, combined_creds, options=_GRPC_CHANNEL_OPTIONS)
+        #     for _ in range(_CHANNEL_POOL_SIZE)
+        # ]
+        # self._stubs = [lnrpc.LightningStub(channel) for channel in self._channels]
+        # self._router_stubs = [routerrpc.RouterStub(channel) for channel in self._channels]
         
         # For the placeholder implementation, we'll simulate connection
-        print(f"Simulated connection to LND at {self.rpc_server} on {self.network}", file=sys.stderr)
+        # The stub types come from the generated modules, so they are typed Any
+        self._channels: List[grpc.Channel] = []
+        self._stubs: List[Any] = []
+        self._router_stubs: List[Any] = []
+        self._rr = itertools.cycle(range(_CHANNEL_POOL_SIZE))
+        logger.info("Simulated connection to LND at %s on %s", self.rpc_server, self.network)
+    
+    def _stub(self):
+        """Return the Lightning service stub of the next pooled channel."""
+        # itertools.cycle advances atomically under the GIL, so no lock is needed
+        return self._stubs[next(self._rr)]
+    
+    def _router_stub(self):
+        """Return the Router service stub of the next pooled channel."""
+        return self._router_stubs[next(self._rr)]
     
     def create_invoice(
         self, 
@@ -90,13 +162,13 @@ class LNDClient:
             Dictionary with invoice details
         """
         # In actual implementation, this would call LND's AddInvoice API
-        # invoice = self.stub.AddInvoice(ln.Invoice(
+        # invoice = self._stub().AddInvoice(ln.Invoice(
         #     value=amount_sat, 
         #     memo=memo or "", 
         #     expiry=expiry
         # ))
         # return {
-        #     "payment_hash": codecs.encode(invoice.r_hash, 'hex').decode(),
+        #     "payment_hash": invoice.r_hash.hex(),
         #     "payment_request": invoice.payment_request,
         #     "add_index": invoice.add_index,
         #     "amount_sat": amount_sat,
@@ -105,16 +177,15 @@ class LNDClient:
         # }
         
         # Placeholder implementation for development
-        import hashlib
-        import time
-        
         # Generate a fake payment hash
-        fake_hash = hashlib.sha256(f"{amount_sat}:{memo}:{time.time()}".encode()).hexdigest()
+        fake_hash = sha256(
+            b"%d:%s:%d" % (amount_sat, (memo or "").encode(), time.monotonic_ns())
+        ).digest().hex()
         
         return {
             "payment_hash": fake_hash,
             "payment_request": f"lnbc{amount_sat}p1fakelnxyz",
-            "add_index": int(time.time()),
+            "add_index": now(),
             "amount_sat": amount_sat,
             "memo": memo or "",
             "expiry": expiry,
@@ -131,11 +202,11 @@ class LNDClient:
             Dictionary with decoded invoice details
         """
         # In actual implementation, this would call LND's DecodePayReq API
-        # decoded = self.stub.DecodePayReq(ln.PayReqString(
+        # decoded = self._stub().DecodePayReq(ln.PayReqString(
         #     pay_req=payment_request
         # ))
         # return {
-        #     "payment_hash": codecs.encode(decoded.payment_hash, 'hex').decode(),
+        #     "payment_hash": decoded.payment_hash,  # already hex in PayReq
         #     "amount_sat": decoded.num_satoshis,
         #     "destination": decoded.destination,
         #     "description": decoded.description,
@@ -144,25 +215,17 @@ class LNDClient:
         # }
         
         # Placeholder implementation for development
-        # Parse a fake amount from the fake payment_request format above
-        try:
-            # Extract amount from lnbcXXXp1fakelnxyz format
-            parts = payment_request.split("lnbc")
-            if len(parts) > 1:
-                amount_part = parts[1].split("p1fakelnxyz")[0]
-                amount_sat = int(amount_part)
-            else:
-                amount_sat = 0
-        except:
-            amount_sat = 0
-            
+        # Parse a fake amount from the lnbcXXXp1fakelnxyz format above
+        match = LNBC_RE.match(payment_request)
+        amount_sat = int(match.group(1)) if match else 0
+        
         return {
             "payment_hash": "fakehash",
             "amount_sat": amount_sat,
             "destination": "fakepubkey",
             "description": "Fake invoice for development",
             "expiry": 3600,
-            "timestamp": int(time.time()),
+            "timestamp": now(),
         }
     
     def pay_invoice(self, payment_request: str, max_fee_sat: Optional[int] = None) -> Dict:
@@ -179,19 +242,19 @@ class LNDClient:
         # In actual implementation, this would call LND's SendPaymentSync API
         # or RouterStub's SendPaymentV2 API for more advanced routing
         # if max_fee_sat is not None:
-        #     payment = self.router_stub.SendPaymentV2(router.SendPaymentRequest(
+        #     payment = self._router_stub().SendPaymentV2(router.SendPaymentRequest(
         #         payment_request=payment_request,
         #         fee_limit_sat=max_fee_sat,
         #         timeout_seconds=60,
         #     ))
         # else:
-        #     payment = self.stub.SendPaymentSync(ln.SendRequest(
+        #     payment = self._stub().SendPaymentSync(ln.SendRequest(
         #         payment_request=payment_request,
         #     ))
         # 
         # return {
-        #     "payment_hash": codecs.encode(payment.payment_hash, 'hex').decode(),
-        #     "payment_preimage": codecs.encode(payment.payment_preimage, 'hex').decode(),
+        #     "payment_hash": payment.payment_hash.hex(),
+        #     "payment_preimage": payment.payment_preimage.hex(),
         #     "payment_route": {
         #         "total_amt": payment.payment_route.total_amt,
         #         "total_fees": payment.payment_route.total_fees,
@@ -201,26 +264,23 @@ class LNDClient:
         
         # Placeholder implementation for development
         decoded = self.decode_invoice(payment_request)
-        
-        # Simulate a successful payment
-        import hashlib
-        import time
-        import random
+        payment_hash = decoded.get("payment_hash", "fakehash")
+        amount_sat = decoded.get("amount_sat", 0)
         
         # Sometimes fail payments randomly for testing
         if random.random() < 0.1:
             return {
-                "payment_hash": decoded.get("payment_hash", "fakehash"),
+                "payment_hash": payment_hash,
                 "status": "FAILED",
                 "failure_reason": "NO_ROUTE",
             }
         
         return {
-            "payment_hash": decoded.get("payment_hash", "fakehash"),
-            "payment_preimage": hashlib.sha256(f"preimage:{time.time()}".encode()).hexdigest(),
+            "payment_hash": payment_hash,
+            "payment_preimage": sha256(b"preimage:%d" % time.monotonic_ns()).digest().hex(),
             "payment_route": {
-                "total_amt": decoded.get("amount_sat", 0),
-                "total_fees": max_fee_sat or int(decoded.get("amount_sat", 0) * 0.01),  # 1% fee
+                "total_amt": amount_sat,
+                "total_fees": max_fee_sat if max_fee_sat is not None else amount_sat // 100,  # 1% fee
             },
             "status": "SUCCEEDED",
         }
@@ -237,10 +297,8 @@ class LNDClient:
         """
         # In actual implementation, this would call LND's ListPayments API
         # and filter for the specific payment_hash
-        # r_hash_bytes = codecs.decode(payment_hash, 'hex')
-        # payments = self.stub.ListPayments(ln.ListPaymentsRequest(
-        #     include_incomplete=True,
-        # ))
+        # r_hash_bytes = bytes.fromhex(payment_hash)
+        # payments = self._stub().ListPayments(_REQ_LIST_PAYMENTS)
         # 
         # for payment in payments.payments:
         #     if payment.payment_hash == payment_hash:
@@ -255,19 +313,15 @@ class LNDClient:
         # return {"error": "Payment not found"}
         
         # Placeholder implementation for development
-        import random
-        
         # Simulate different payment statuses
-        statuses = ["SUCCEEDED", "FAILED", "IN_FLIGHT"]
-        weights = [0.8, 0.1, 0.1]  # 80% success, 10% failed, 10% in-flight
-        status = random.choices(statuses, weights=weights, k=1)[0]
+        status = simulated_status(random.random())
         
         return {
             "payment_hash": payment_hash,
             "status": status,
             "value_sat": random.randint(1000, 100000),
             "fee_sat": random.randint(1, 100),
-            "creation_time_ns": int(time.time() * 1e9),
+            "creation_time_ns": time.time_ns(),
         }
     
     def get_wallet_balance(self) -> Dict:
@@ -278,7 +332,7 @@ class LNDClient:
             Dictionary with balance information
         """
         # In actual implementation, this would call LND's WalletBalance API
-        # balance = self.stub.WalletBalance(ln.WalletBalanceRequest())
+        # balance = self._stub().WalletBalance(_REQ_WALLET_BALANCE)
         # return {
         #     "total_balance": balance.total_balance,
         #     "confirmed_balance": balance.confirmed_balance,
@@ -286,8 +340,6 @@ class LNDClient:
         # }
         
         # Placeholder implementation for development
-        import random
-        
         confirmed = random.randint(100000, 1000000)
         unconfirmed = random.randint(0, 100000)
         
@@ -305,15 +357,13 @@ class LNDClient:
             Dictionary with channel balance information
         """
         # In actual implementation, this would call LND's ChannelBalance API
-        # balance = self.stub.ChannelBalance(ln.ChannelBalanceRequest())
+        # balance = self._stub().ChannelBalance(_REQ_CHANNEL_BALANCE)
         # return {
         #     "balance": balance.balance,
         #     "pending_open_balance": balance.pending_open_balance,
         # }
         
         # Placeholder implementation for development
-        import random
-        
         balance = random.randint(100000, 1000000)
         pending = random.randint(0, 100000)
         
@@ -330,27 +380,14 @@ class LNDClient:
             List of channel dictionaries
         """
         # In actual implementation, this would call LND's ListChannels API
-        # channels = self.stub.ListChannels(ln.ListChannelsRequest())
-        # 
-        # result = []
-        # for channel in channels.channels:
-        #     result.append({
-        #         "active": channel.active,
-        #         "remote_pubkey": channel.remote_pubkey,
-        #         "channel_point": channel.channel_point,
-        #         "chan_id": channel.chan_id,
-        #         "capacity": channel.capacity,
-        #         "local_balance": channel.local_balance,
-        #         "remote_balance": channel.remote_balance,
-        #         "commit_fee": channel.commit_fee,
-        #         "private": channel.private,
-        #     })
+        # channels = self._stub().ListChannels(_REQ_LIST_CHANNELS)
         # 
-        # return result
+        # return [
+        #     dict(zip(CHANNEL_FIELDS, _get_channel_fields(channel)))
+        #     for channel in channels.channels
+        # ]
         
         # Placeholder implementation for development
-        import random
-        
         # Generate random fake channels
         result = []
         for i in range(random.randint(1, 5)):
@@ -395,7 +432,7 @@ class LNDClient:
         # or OpenChannel API for async channel opening
         # 
         # # First check if we're connected to the peer
-        # peers = self.stub.ListPeers(ln.ListPeersRequest())
+        # peers = self._stub().ListPeers(_REQ_LIST_PEERS)
         # is_connected = any(peer.pub_key == peer_pubkey for peer in peers.peers)
         # 
         # if not is_connected:
@@ -409,31 +446,28 @@ class LNDClient:
         # 
         # # Now open the channel
         # try:
-        #     response = self.stub.OpenChannelSync(ln.OpenChannelRequest(
-        #         node_pubkey=codecs.decode(peer_pubkey, 'hex'),
+        #     response = self._stub().OpenChannelSync(ln.OpenChannelRequest(
+        #         node_pubkey=bytes.fromhex(peer_pubkey),
         #         local_funding_amount=local_amt_sat,
         #         push_sat=push_amt_sat,
         #         private=private,
         #     ))
         #     
         #     return {
-        #         "funding_txid": codecs.encode(response.funding_txid, 'hex').decode(),
+        #         "funding_txid": response.funding_txid.hex(),
         #         "output_index": response.output_index,
         #     }
         # except Exception as e:
         #     return {"error": f"Failed to open channel: {str(e)}"}
         
         # Placeholder implementation for development
-        import random
-        import time
-        
         # Simulate failures sometimes
         if random.random() < 0.2:
             return {"error": "Failed to open channel: peer not reachable"}
         
         # Simulate successful channel opening
         return {
-            "funding_txid": f"fakefundingtxid{int(time.time())}",
+            "funding_txid": f"fakefundingtxid{now()}",
             "output_index": 0,
             "status": "PENDING_OPEN",
         }
@@ -466,27 +500,22 @@ class LNDClient:
         #     
         #     # This is actually a streaming response in LND
         #     # For simplicity, we'll just return the first update
-        #     for update in self.stub.CloseChannel(request):
+        #     for update in self._stub().CloseChannel(request):
         #         if update.HasField('close_pending'):
         #             return {
-        #                 "closing_txid": codecs.encode(
-        #                     update.close_pending.txid, 'hex'
-        #                 ).decode(),
+        #                 "closing_txid": update.close_pending.txid.hex(),
         #                 "status": "PENDING_CLOSE",
         #             }
         # except Exception as e:
         #     return {"error": f"Failed to close channel: {str(e)}"}
         
         # Placeholder implementation for development
-        import random
-        import time
-        
         # Simulate failures sometimes
         if random.random() < 0.1:
             return {"error": "Failed to close channel: channel not found"}
         
         # Simulate successful channel closing
         return {
-            "closing_txid": f"fakeclosingtxid{int(time.time())}",
+            "closing_txid": f"fakeclosingtxid{now()}",
             "status": "PENDING_CLOSE" if not force else "PENDING_FORCE_CLOSE",
         }
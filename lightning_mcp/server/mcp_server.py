@@ -3,57 +3,106 @@
 Lightning MCP Server - Exposes Lightning Network functionality as MCP tools.
 Simplified implementation for FastMCP 0.4.1 compatibility.
 """
-import json
+import asyncio
+import functools
+import importlib
+import inspect
+import logging
 import os
+import queue
 import sys
+from logging.handlers import QueueHandler, QueueListener
+from types import MappingProxyType
 from typing import Dict, List, Optional, Any
 
+import orjson
 from fastmcp import FastMCP
-from fastmcp.server import Context
+from fastmcp.resources import FunctionResource
 
-# Import Lightning Network client implementations
-from lightning_mcp.lightning.lnd_client import LNDClient
-from lightning_mcp.lightning.clightning_client import CLightningClient
+try:
+    import uvloop
+except ImportError:  # uvloop is not available on Windows
+    uvloop = None
 
-# Global variables
-_ln_client = None
-_config = None
+from lightning_mcp.utils.cache import ttl_cache
+from lightning_mcp.utils.config import get_config_with_validation
 
-# Helper function to load configuration
+logger = logging.getLogger(__name__)
+
+# Lightning Network client implementations, imported on demand so a deployment
+# only loads the backend it is configured for (grpc is slow to import)
+_CLIENT_CLASSES = {
+    "lnd": ("lightning_mcp.lightning.lnd_client", "LNDClient"),
+    "c-lightning": ("lightning_mcp.lightning.clightning_client", "CLightningClient"),
+}
+
+# Helper function to make a parsed config read-only all the way down:
+# objects become mapping proxies and arrays become tuples
+def freeze_config(value):
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze_config(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze_config(item) for item in value)
+    return value
+
+# Helper function to load and validate configuration, read once and shared read-only.
+# An invalid config raises a ValueError naming every missing or bad setting.
+@functools.lru_cache(maxsize=1)
 def load_config():
     config_path = os.environ.get("CONFIG_PATH", "config.json")
-    with open(config_path) as f:
-        return json.load(f)
+    return freeze_config(get_config_with_validation(config_path))
 
-# Helper function to get the Lightning client
+# Helper function to get the Lightning client, created once per process.
+# Failures raise rather than return None so the cache never pins a missing client.
+@functools.cache
 def get_ln_client():
-    global _ln_client, _config
+    config = load_config()
     
-    if _ln_client is not None:
-        return _ln_client
+    implementation = config["lightning"]["implementation"]
+    logger.info("Initializing %s client...", implementation)
     
-    if _config is None:
-        _config = load_config()
+    if implementation not in _CLIENT_CLASSES:
+        raise ValueError(f"Unsupported Lightning implementation: {implementation}")
     
-    try:
-        implementation = _config["lightning"]["implementation"]
-        print(f"Initializing {implementation} client...")
-        
-        if implementation == "lnd":
-            _ln_client = LNDClient(_config["lightning"]["connection"]["lnd"])
-        elif implementation == "c-lightning":
-            conn_config = _config["lightning"]["connection"]["c-lightning"]
-            print(f"Connecting to c-lightning at socket path: {conn_config['socket_path']}")
-            _ln_client = CLightningClient(conn_config)
-        else:
-            print(f"Unsupported Lightning implementation: {implementation}")
-            return None
-        
-        print(f"Successfully initialized {implementation} client")
-        return _ln_client
-    except Exception as e:
-        print(f"Error initializing Lightning client: {e}")
-        return None
+    conn_config = config["lightning"]["connection"][implementation]
+    if implementation == "c-lightning":
+        logger.info("Connecting to c-lightning at socket path: %s", conn_config["socket_path"])
+    
+    module_name, class_name = _CLIENT_CLASSES[implementation]
+    client_class = getattr(importlib.import_module(module_name), class_name)
+    
+    # The config allows extra connection settings, so pass only the ones the
+    # client constructor accepts
+    accepted = inspect.signature(client_class).parameters
+    ignored = sorted(key for key in conn_config if key not in accepted)
+    if ignored:
+        logger.warning("Ignoring unknown %s connection settings: %s", implementation, ", ".join(ignored))
+    ln_client = client_class(**{key: value for key, value in conn_config.items() if key in accepted})
+    
+    logger.info("Successfully initialized %s client", implementation)
+    return ln_client
+
+# Helper function to call a Lightning client method, sync or async.
+# Blocking clients (LND's gRPC stubs) run in a worker thread so a slow RPC
+# does not stall the event loop serving every other SSE session.
+async def call_ln_client(method, *args, **kwargs):
+    if not inspect.iscoroutinefunction(method):
+        return await asyncio.to_thread(method, *args, **kwargs)
+    return await method(*args, **kwargs)
+
+# Helper function to serialize a tool or resource result. FastMCP passes strings
+# through as-is; anything else goes through pydantic and stdlib json.
+def to_json(data) -> str:
+    return orjson.dumps(data).decode()
+
+# FastMCP calls resource functions without awaiting them, so coroutine
+# resources are registered through this subclass, which awaits the result
+class AsyncFunctionResource(FunctionResource):
+    async def read(self):
+        result = await self.fn()
+        if isinstance(result, (str, bytes)):
+            return result
+        return to_json(result)
 
 # Initialize the FastMCP server
 def init_server():
@@ -61,14 +110,49 @@ def init_server():
     config = load_config()
     
     # Extract server settings
-    host = config.get("server", {}).get("host", "0.0.0.0")
-    port = config.get("server", {}).get("port", 8080)
-    debug = config.get("server", {}).get("debug", False)
-    log_level = config.get("server", {}).get("log_level", "INFO").upper()
+    server_config = config.get("server", {})
+    host = server_config.get("host", "0.0.0.0")
+    port = server_config.get("port", 8080)
+    debug = server_config.get("debug", False)
+    log_level = server_config.get("log_level", "INFO").upper()
+    
+    # Apply the configured level to this package's logs; records below it are
+    # dropped before any message formatting happens
+    logging.getLogger("lightning_mcp").setLevel(log_level)
+    
+    # Connect to the Lightning node once; every handler below shares this client
+    ln_client = get_ln_client()
+    
+    # Balances move at block granularity and channels change rarely, so clients
+    # polling these reads are served from a short-lived cache
+    advanced_config = config.get("advanced", {})
+    
+    @ttl_cache(advanced_config.get("balance_cache_seconds", 2))
+    async def get_wallet_balance_cached():
+        return await call_ln_client(ln_client.get_wallet_balance)
+    
+    @ttl_cache(advanced_config.get("channels_cache_seconds", 30))
+    async def list_channels_cached():
+        return await call_ln_client(ln_client.list_channels)
+    
+    # Node details reported by the info resource, resolved once
+    implementation = config["lightning"]["implementation"]
+    network = config["lightning"]["connection"][implementation].get("network", "unknown")
+    mcp_version = server_config.get("mcp_version", "unknown")
+    
+    # Only the channel count changes between reads, so the rest of the node
+    # info response is serialized once and the count is spliced in per read
+    node_info_prefix = to_json({
+        "implementation": implementation,
+        "version": mcp_version,
+        "status": "ok",
+        "network": network,
+    })[:-1]
+    node_info_template = node_info_prefix.replace("%", "%%") + ',"channels":%d}'
     
     # Create server instance
     server = FastMCP(
-        name=config.get("server", {}).get("mcp_name", "Lightning MCP"),
+        name=server_config.get("mcp_name", "Lightning MCP"),
         host=host,
         port=port,
         debug=debug,
@@ -77,136 +161,120 @@ def init_server():
     
     # Register tools
     @server.tool("lightning/createInvoice")
-    def create_invoice(amount: int, memo: str = "", ctx: Context = None) -> Dict:
+    async def create_invoice(amount: int, memo: str = "") -> str:
         """Create a Lightning Network invoice."""
-        if ctx:
-            ctx.info(f"Creating invoice for {amount} sats with memo: {memo}")
+        logger.debug("Creating invoice for %d sats with memo: %s", amount, memo)
         
         try:
-            ln_client = get_ln_client()
-            if ln_client is None:
-                return {"error": "Lightning client not available", "status": "error"}
-                
-            invoice = ln_client.create_invoice(amount, memo)
-            return invoice
+            invoice = await call_ln_client(ln_client.create_invoice, amount, memo)
+            return to_json(invoice)
         except Exception as e:
             error_msg = f"Error creating invoice: {str(e)}"
-            if ctx:
-                ctx.error(error_msg)
-            return {"error": error_msg, "status": "error"}
+            logger.error(error_msg)
+            return to_json({"error": error_msg, "status": "error"})
     
     @server.tool("lightning/payInvoice")
-    def pay_invoice(payment_request: str, ctx: Context = None) -> Dict:
+    async def pay_invoice(payment_request: str) -> str:
         """Pay a Lightning Network invoice."""
-        if ctx:
-            ctx.info(f"Paying invoice: {payment_request[:30]}...")
+        logger.debug("Paying invoice: %.30s...", payment_request)
         
         try:
-            ln_client = get_ln_client()
-            if ln_client is None:
-                return {"error": "Lightning client not available", "status": "error"}
-                
-            payment = ln_client.pay_invoice(payment_request)
-            return payment
+            payment = await call_ln_client(ln_client.pay_invoice, payment_request)
+            return to_json(payment)
         except Exception as e:
             error_msg = f"Error paying invoice: {str(e)}"
-            if ctx:
-                ctx.error(error_msg)
-            return {"error": error_msg, "status": "error"}
+            logger.error(error_msg)
+            return to_json({"error": error_msg, "status": "error"})
     
     @server.tool("lightning/checkPayment")
-    def check_payment(payment_hash: str, ctx: Context = None) -> Dict:
+    async def check_payment(payment_hash: str) -> str:
         """Check the status of a Lightning Network payment."""
-        if ctx:
-            ctx.info(f"Checking payment status for hash: {payment_hash}")
+        logger.debug("Checking payment status for hash: %s", payment_hash)
         
         try:
-            ln_client = get_ln_client()
-            if ln_client is None:
-                return {"error": "Lightning client not available", "status": "error"}
-                
-            payment_status = ln_client.check_payment(payment_hash)
-            return payment_status
+            payment_status = await call_ln_client(ln_client.get_payment_status, payment_hash)
+            return to_json(payment_status)
         except Exception as e:
             error_msg = f"Error checking payment: {str(e)}"
-            if ctx:
-                ctx.error(error_msg)
-            return {"error": error_msg, "status": "error"}
+            logger.error(error_msg)
+            return to_json({"error": error_msg, "status": "error"})
     
     @server.tool("lightning/getWalletBalance")
-    def get_wallet_balance(ctx: Context = None) -> Dict:
+    async def get_wallet_balance() -> str:
         """Get the current wallet balance."""
-        if ctx:
-            ctx.info("Retrieving wallet balance")
+        logger.debug("Retrieving wallet balance")
         
         try:
-            ln_client = get_ln_client()
-            if ln_client is None:
-                return {"error": "Lightning client not available", "status": "error"}
-                
-            balance = ln_client.get_wallet_balance()
-            return balance
+            balance = await get_wallet_balance_cached()
+            return to_json(balance)
         except Exception as e:
             error_msg = f"Error getting wallet balance: {str(e)}"
-            if ctx:
-                ctx.error(error_msg)
-            return {"error": error_msg, "status": "error"}
+            logger.error(error_msg)
+            return to_json({"error": error_msg, "status": "error"})
     
     # Add resources
-    @server.resource("resource://lightning/node/info")
-    def get_node_info() -> Dict:
+    async def get_node_info() -> str:
         """Get basic information about the Lightning node."""
-        global _config
-        if _config is None:
-            _config = load_config()
-        
+        # Add channel info if available
         try:
-            ln_client = get_ln_client()
-            
-            # Basic info
-            node_info = {
-                "implementation": _config["lightning"]["implementation"],
-                "version": _config["server"]["mcp_version"],
-                "status": "ok"
-            }
+            channels = await list_channels_cached()
+            channel_count = len(channels) if channels else 0
+        except Exception:
+            channel_count = 0
             
-            # Add network info
-            try:
-                node_info["network"] = _config["lightning"]["connection"][_config["lightning"]["implementation"]]["network"]
-            except (KeyError, TypeError):
-                node_info["network"] = "unknown"
-            
-            # Add channel info if available
-            if ln_client is not None and hasattr(ln_client, "list_channels"):
-                try:
-                    channels = ln_client.list_channels()
-                    node_info["channels"] = len(channels) if channels else 0
-                except Exception:
-                    node_info["channels"] = 0
-            else:
-                node_info["channels"] = 0
-                
-            return node_info
-        except Exception as e:
-            return {
-                "implementation": "unknown",
-                "network": "unknown",
-                "version": "unknown",
-                "channels": 0,
-                "status": f"error: {str(e)}"
-            }
+        return node_info_template % channel_count
+    
+    server.add_resource(AsyncFunctionResource(
+        uri="resource://lightning/node/info",
+        mime_type="application/json",
+        fn=get_node_info,
+    ))
     
     return server, host, port
 
+# Helper function to set up logging. Records are queued by the calling thread and
+# written by a listener thread, so a slow stdout never blocks the event loop.
+def setup_logging(level=logging.INFO):
+    log_queue = queue.Queue(-1)
+    
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(QueueHandler(log_queue))
+    
+    listener = QueueListener(log_queue, handler, respect_handler_level=True)
+    listener.start()
+    return listener
+
 def main():
     """Run the MCP server."""
-    server, host, port = init_server()
+    listener = setup_logging()
     
-    print(f"Starting Lightning MCP server on {host}:{port}")
-    print(f"Server will be available to Cursor at: http://{host}:{port}/sse")
+    # server.run() starts its own asyncio loop; install uvloop's policy first
+    if uvloop is not None:
+        uvloop.install()
     
-    # Run the server with SSE transport
-    server.run(transport="sse")
+    try:
+        # Fail fast: an invalid config or unsupported implementation stops startup
+        # instead of surfacing later as an error from every tool call. The node
+        # itself is first contacted by a tool call (the c-lightning socket opens
+        # lazily), so an unreachable node is reported in the tool results.
+        try:
+            server, host, port = init_server()
+        except Exception as e:
+            logger.error("Error initializing Lightning MCP server: %s", e)
+            sys.exit(1)
+        
+        logger.info("Starting Lightning MCP server on %s:%s", host, port)
+        logger.info("Server will be available to Cursor at: http://%s:%s/sse", host, port)
+        
+        # Run the server with SSE transport
+        server.run(transport="sse")
+    finally:
+        # Flush queued records before the process exits
+        listener.stop()
 
 if __name__ == "__main__":
     main()
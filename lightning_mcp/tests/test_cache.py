@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+"""
+Test the caching utilities.
+"""
+import asyncio
+import time
+
+from lightning_mcp.utils.cache import ttl_cache
+
+def test_ttl_cache_reuses_result_until_expiry():
+    """Test that a cached result is reused within the TTL and refreshed after."""
+    calls = []
+
+    @ttl_cache(0.05)
+    def get_balance(node):
+        calls.append(node)
+        return {"node": node, "call": len(calls)}
+
+    first = get_balance("a")
+    assert get_balance("a") is first
+    assert get_balance("b") is not first
+    assert calls == ["a", "b"]
+
+    time.sleep(0.06)
+    assert get_balance("a")["call"] == 3
+
+def test_ttl_cache_awaits_coroutines():
+    """Test that async functions cache their awaited result, not the coroutine."""
+    calls = []
+
+    @ttl_cache(60)
+    async def list_channels(node):
+        calls.append(node)
+        return [node]
+
+    async def run():
+        return await list_channels("a"), await list_channels("a")
+
+    first, second = asyncio.run(run())
+    assert first == ["a"]
+    assert second is first
+    assert len(calls) == 1
+
+    list_channels.cache_clear()
+    asyncio.run(run())
+    assert len(calls) == 2
+
+def test_ttl_cache_does_not_cache_errors():
+    """Test that exceptions propagate and are retried on the next call."""
+    calls = []
+
+    @ttl_cache(60)
+    def flaky():
+        calls.append(1)
+        if len(calls) == 1:
+            raise ConnectionError("node unavailable")
+        return "ok"
+
+    try:
+        flaky()
+    except ConnectionError:
+        pass
+    assert flaky() == "ok"
+    assert len(calls) == 2
+
+def test_ttl_cache_shares_concurrent_misses():
+    """Test that concurrent misses wait on one call, and share its error without caching it."""
+    calls = []
+
+    @ttl_cache(60)
+    async def get_info(node):
+        calls.append(node)
+        await asyncio.sleep(0.01)
+        if len(calls) == 1:
+            raise ConnectionError("node unavailable")
+        return {"node": node}
+
+    async def run():
+        return await asyncio.gather(*(get_info("a") for _ in range(5)), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, ConnectionError) for r in results)
+    assert len(calls) == 1
+
+    results = asyncio.run(run())
+    assert results == [{"node": "a"}] * 5
+    assert all(r is results[0] for r in results)
+    assert len(calls) == 2
@@ -0,0 +1,234 @@
+#!/usr/bin/env python
+"""
+Test the c-lightning JSON-RPC transport against a fake lightningd socket.
+"""
+import asyncio
+import json
+import threading
+from typing import List, Optional
+
+import pytest
+
+from lightning_mcp.lightning.clightning_client import _CONNECTIONS, CLightningClient, RpcError
+
+class FakeLightningd:
+    """
+    Minimal lightningd RPC socket, served from its own thread and event loop so
+    it outlives the asyncio.run() calls made by the tests.
+
+    Methods: "echo" returns its params after an optional "delay", "fail"
+    returns a JSON-RPC error, "wait" never answers and "hangup" closes the
+    connection.
+    """
+
+    def __init__(self, socket_path: str):
+        self.socket_path = socket_path
+        self.methods: List[str] = []
+        self._loop = asyncio.new_event_loop()
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+        self._server = asyncio.run_coroutine_threadsafe(
+            asyncio.start_unix_server(self._handle, self.socket_path), self._loop
+        ).result(5)
+
+    def stop(self) -> None:
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result(5)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(5)
+        self._loop.close()
+
+    async def _shutdown(self) -> None:
+        if self._server is not None:
+            self._server.close()
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _handle(self, reader, writer) -> None:
+        decoder = json.JSONDecoder()
+        buffer = ""
+        while True:
+            data = await reader.read(65536)
+            if not data:
+                break
+            buffer += data.decode()
+            # Requests arrive back to back with no separator
+            while buffer:
+                try:
+                    request, end = decoder.raw_decode(buffer)
+                except json.JSONDecodeError:
+                    break
+                buffer = buffer[end:]
+                self.methods.append(request["method"])
+                if request["method"] == "hangup":
+                    writer.close()
+                    return
+                asyncio.ensure_future(self._reply(writer, request))
+        writer.close()
+
+    async def _reply(self, writer, request) -> None:
+        method, params = request["method"], request["params"]
+        if method == "wait":
+            return
+        await asyncio.sleep(params.get("delay", 0))
+        if method == "fail":
+            response = {"id": request["id"], "error": {"code": -32601, "message": "Unknown command"}}
+        else:
+            response = {"id": request["id"], "result": params}
+        writer.write(json.dumps({"jsonrpc": "2.0", **response}).encode() + b"\n\n")
+
+@pytest.fixture
+def lightningd(tmp_path):
+    """Start a fake lightningd RPC socket for the test."""
+    server = FakeLightningd(str(tmp_path / "lightning-rpc"))
+    server.start()
+    yield server
+    server.stop()
+
+def test_results_and_errors_are_routed_by_id(lightningd):
+    """Test that out-of-order responses and errors reach the call that made them."""
+    client = CLightningClient(lightningd.socket_path, network="regtest")
+
+    async def run():
+        try:
+            return await asyncio.gather(
+                client._call_method("echo", n=1, delay=0.05),
+                client._call_method("echo", n=2, delay=0.01),
+                client._call_method("fail"),
+                client._call_method("echo", n=3),
+                return_exceptions=True,
+            )
+        finally:
+            await client.close()
+
+    first, second, error, third = asyncio.run(run())
+    assert first == {"n": 1, "delay": 0.05}
+    assert second == {"n": 2, "delay": 0.01}
+    assert third == {"n": 3}
+    assert isinstance(error, RpcError)
+    assert error.method == "fail"
+    assert error.error["code"] == -32601
+
+def test_pending_calls_fail_when_peer_closes(lightningd):
+    """Test that calls still waiting when the socket closes raise ConnectionError."""
+    client = CLightningClient(lightningd.socket_path, network="regtest")
+
+    async def run():
+        try:
+            return await asyncio.wait_for(
+                asyncio.gather(
+                    client._call_method("wait"),
+                    client._call_method("hangup"),
+                    return_exceptions=True,
+                ),
+                5,
+            )
+        finally:
+            await client.close()
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, ConnectionError) for r in results)
+
+def test_cancelled_call_does_not_cancel_others(lightningd):
+    """Test that cancelling one caller leaves the calls sharing its write intact."""
+    client = CLightningClient(lightningd.socket_path, network="regtest")
+
+    async def run():
+        try:
+            await client._call_method("echo")
+            tasks = [
+                asyncio.create_task(client._call_method("echo", n=n, delay=0.01))
+                for n in range(3)
+            ]
+            await asyncio.sleep(0)
+            tasks[0].cancel()
+            return await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            await client.close()
+
+    cancelled, *results = asyncio.run(run())
+    assert isinstance(cancelled, asyncio.CancelledError)
+    assert results == [{"n": 1, "delay": 0.01}, {"n": 2, "delay": 0.01}]
+
+def test_client_is_reusable_across_event_loops(lightningd):
+    """Test that one client keeps working when each call runs in a new event loop."""
+    client = CLightningClient(lightningd.socket_path, network="regtest")
+
+    for n in range(2):
+        result = asyncio.run(asyncio.wait_for(client._call_method("echo", n=n), 5))
+        assert result == {"n": n}
+
+    asyncio.run(client.close())
+    assert lightningd.methods == ["echo", "echo"]
+
+def test_concurrent_calls_share_one_write(lightningd):
+    """Test that calls made in the same loop iteration go out in one socket write."""
+    client = CLightningClient(lightningd.socket_path, network="regtest")
+
+    async def run():
+        try:
+            await client._call_method("echo")
+            writer = client._conn._writer
+            writes = []
+            write = writer.write
+            writer.write = lambda data: (writes.append(data), write(data))[1]
+            results = await asyncio.gather(*(client._call_method("echo", n=n) for n in range(5)))
+            return results, writes
+        finally:
+            await client.close()
+
+    results, writes = asyncio.run(run())
+    assert results == [{"n": n} for n in range(5)]
+    assert len(writes) == 1
+    assert writes[0].count(b'"method":"echo"') == 5
+
+def test_unwritable_requests_fail(lightningd):
+    """Test that requests queued when the socket closes fail instead of hanging."""
+    client = CLightningClient(lightningd.socket_path, network="regtest")
+
+    async def run():
+        try:
+            await client._call_method("echo")
+            tasks = [asyncio.create_task(client._call_method("echo", n=n)) for n in range(3)]
+            # Let every call queue its request, then close before the flush runs
+            await asyncio.sleep(0)
+            assert client._conn._flush_task is not None
+            client._conn._writer.close()
+            return await asyncio.wait_for(asyncio.gather(*tasks, return_exceptions=True), 5)
+        finally:
+            await client.close()
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, ConnectionError) for r in results)
+    assert lightningd.methods == ["echo"]
+
+def test_clients_of_one_node_share_a_connection(lightningd):
+    """Test that the pooled connection stays open until its last client closes."""
+    first = CLightningClient(lightningd.socket_path, network="regtest")
+    second = CLightningClient(lightningd.socket_path, network="regtest")
+    other_network = CLightningClient(lightningd.socket_path, network="testnet")
+    key = (lightningd.socket_path, "regtest")
+    assert first._conn is second._conn is _CONNECTIONS[key]
+    assert other_network._conn is not first._conn
+    assert _CONNECTIONS[key].clients == 2
+
+    async def run():
+        await first._call_method("echo")
+        await first.close()
+        assert _CONNECTIONS[key].clients == 1
+        with pytest.raises(ConnectionError):
+            await first._call_method("echo")
+
+        # The socket the first client opened is still serving the second
+        assert await second._call_method("echo", n=1) == {"n": 1}
+        await second.close()
+        assert key not in _CONNECTIONS
+
+        await other_network.close()
+
+    asyncio.run(run())
+    assert lightningd.methods == ["echo", "echo"]
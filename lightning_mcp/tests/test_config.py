@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+"""
+Test the configuration utilities.
+"""
+import json
+
+import pytest
+
+from lightning_mcp.utils.config import (
+    clear_config_cache,
+    get_config_with_validation,
+    validate_config,
+)
+
+MINIMAL_CONFIG = {
+    "server": {"host": "localhost", "port": 8080},
+    "security": {},
+    "lightning": {
+        "implementation": "c-lightning",
+        "connection": {
+            "c-lightning": {"socket_path": "/tmp/lightning-rpc", "network": "regtest"}
+        },
+    },
+    "payment_limits": {},
+}
+
+@pytest.fixture
+def config_path(tmp_path):
+    """Write a minimal valid config and clear the config cache afterwards."""
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps(MINIMAL_CONFIG))
+    yield str(path)
+    clear_config_cache()
+
+def test_config_is_cached_per_path(config_path, monkeypatch):
+    """Test that repeated loads reuse the parsed config until the cache is cleared."""
+    first = get_config_with_validation(config_path)
+    with open(config_path, "w") as f:
+        json.dump(dict(MINIMAL_CONFIG, server={"host": "localhost", "port": 9090}), f)
+    assert get_config_with_validation(config_path) == first
+
+    # The env var default resolves to the same cache entry
+    monkeypatch.setenv("LIGHTNING_MCP_CONFIG", config_path)
+    assert get_config_with_validation() == first
+
+    clear_config_cache()
+    assert get_config_with_validation(config_path)["server"]["port"] == 9090
+
+def test_cached_config_is_copied(config_path):
+    """Test that changes to a returned config do not leak into later loads."""
+    config = get_config_with_validation(config_path)
+    config["server"]["port"] = 1
+    assert get_config_with_validation(config_path)["server"]["port"] == 8080
+
+def test_invalid_config_is_not_cached(config_path):
+    """Test that a validation error is raised again once the file is fixed."""
+    with open(config_path, "w") as f:
+        json.dump({"server": {}}, f)
+
+    with pytest.raises(ValueError):
+        get_config_with_validation(config_path)
+
+    with open(config_path, "w") as f:
+        json.dump(MINIMAL_CONFIG, f)
+    assert get_config_with_validation(config_path)["server"]["port"] == 8080
+
+@pytest.mark.parametrize("config", [[], {"lightning": "lnd"}, {"lightning": {"connection": []}}])
+def test_malformed_config_raises_value_error(config_path, config):
+    """Test that sections of the wrong type are reported as validation errors."""
+    with open(config_path, "w") as f:
+        json.dump(config, f)
+
+    with pytest.raises(ValueError):
+        get_config_with_validation(config_path)
+
+@pytest.mark.parametrize("port", ["8080", True, 8080.0])
+def test_port_must_be_an_integer(port):
+    """Test that values of the wrong type are rejected rather than coerced."""
+    config = dict(MINIMAL_CONFIG, server={"host": "localhost", "port": port})
+    with pytest.raises(ValueError, match="port"):
+        validate_config(config)
+
+@pytest.mark.parametrize("seconds, valid", [(0, True), (2.5, True), ("2", False), (-1, False), (True, False)])
+def test_cache_ttls_are_validated(seconds, valid):
+    """Test that the advanced cache TTLs must be non-negative numbers."""
+    for key in ("balance_cache_seconds", "channels_cache_seconds"):
+        config = dict(MINIMAL_CONFIG, advanced={key: seconds, "connection_timeout_seconds": 30})
+        if valid:
+            validate_config(config)
+        else:
+            with pytest.raises(ValueError, match=key):
+                validate_config(config)
+
+def test_lnd_connection_fields_are_required():
+    """Test that LND connection settings are validated only when LND is selected."""
+    config = dict(MINIMAL_CONFIG)
+    config["lightning"] = {
+        "implementation": "lnd",
+        "connection": {"lnd": {"rpc_server": "localhost:10009"}},
+    }
+    with pytest.raises(ValueError, match="macaroon_path"):
+        validate_config(config)
+
+    config["lightning"]["implementation"] = "c-lightning"
+    config["lightning"]["connection"]["c-lightning"] = {"socket_path": "/tmp/lightning-rpc"}
+    validate_config(config)
+
+def test_path_settings_are_expanded(config_path, monkeypatch):
+    """Test that ~ in certificate, macaroon and socket paths is expanded on load."""
+    monkeypatch.setenv("HOME", "/home/node")
+    config = dict(MINIMAL_CONFIG)
+    config["security"] = {"tls_cert_path": "~/tls.cert"}
+    config["lightning"] = {
+        "implementation": "c-lightning",
+        "connection": {
+            "c-lightning": {"socket_path": "~/.lightning/lightning-rpc"},
+            "lnd": {"macaroon_path": "~/.lnd/admin.macaroon", "rpc_server": "~/not-a-path"},
+        },
+    }
+    with open(config_path, "w") as f:
+        json.dump(config, f)
+
+    loaded = get_config_with_validation(config_path)
+    assert loaded["security"]["tls_cert_path"] == "/home/node/tls.cert"
+    connection = loaded["lightning"]["connection"]
+    assert connection["c-lightning"]["socket_path"] == "/home/node/.lightning/lightning-rpc"
+    assert connection["lnd"]["macaroon_path"] == "/home/node/.lnd/admin.macaroon"
+    assert connection["lnd"]["rpc_server"] == "~/not-a-path"
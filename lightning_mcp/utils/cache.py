@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+"""
+Caching utilities for Lightning MCP.
+"""
+import asyncio
+import functools
+import inspect
+import threading
+import time
+from typing import Any, Callable, Dict, Protocol, Tuple, cast
+
+class CachedFunction(Protocol):
+    """A function wrapped by ttl_cache, with a way to drop its cached results."""
+
+    cache_clear: Callable[[], None]
+
+    def __call__(self, *args: Any) -> Any: ...
+
+def ttl_cache(seconds: float) -> Callable[[Callable], CachedFunction]:
+    """
+    Memoize a function's result for a short time.
+
+    Results are keyed on the positional arguments, which must be hashable.
+    Exceptions are not cached. Coroutine functions are supported: the awaited
+    result is cached, not the coroutine object, and concurrent misses for the
+    same arguments wait on a single call instead of each making their own.
+
+    Args:
+        seconds: How long a cached result stays valid
+
+    Returns:
+        Decorator that wraps a function with the cache
+    """
+    def decorator(func: Callable) -> CachedFunction:
+        cache: Dict[Tuple, Tuple[float, Any]] = {}
+        lock = threading.Lock()
+
+        def lookup(args: Tuple) -> Tuple[bool, Any]:
+            with lock:
+                entry = cache.get(args)
+            if entry is not None and entry[0] > time.monotonic():
+                return True, entry[1]
+            return False, None
+
+        def store(args: Tuple, value: Any) -> None:
+            with lock:
+                cache[args] = (time.monotonic() + seconds, value)
+
+        if inspect.iscoroutinefunction(func):
+            # Calls in progress, shared by every caller that misses on the same key
+            inflight: Dict[Tuple, asyncio.Task] = {}
+
+            async def fill(args: Tuple) -> Any:
+                try:
+                    value = await func(*args)
+                    store(args, value)
+                    return value
+                finally:
+                    if inflight.get(args) is asyncio.current_task():
+                        del inflight[args]
+
+            @functools.wraps(func)
+            async def async_wrapper(*args):
+                hit, value = lookup(args)
+                if hit:
+                    return value
+                task = inflight.get(args)
+                if task is None or task.get_loop() is not asyncio.get_running_loop():
+                    task = inflight[args] = asyncio.ensure_future(fill(args))
+                # Shielded so a cancelled caller does not cancel the call for the others
+                return await asyncio.shield(task)
+            wrapper = async_wrapper
+        else:
+            @functools.wraps(func)
+            def sync_wrapper(*args):
+                hit, value = lookup(args)
+                if hit:
+                    return value
+                value = func(*args)
+                store(args, value)
+                return value
+            wrapper = sync_wrapper
+
+        def cache_clear() -> None:
+            with lock:
+                cache.clear()
+
+        cached = cast(CachedFunction, wrapper)
+        cached.cache_clear = cache_clear
+        return cached
+    return decorator
@@ -2,10 +2,14 @@
 """
 Config utilities for Lightning MCP.
 """
-import json
+import copy
 import os
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Literal, Optional
+
+import orjson
+from pydantic import BaseModel, ConfigDict, Field, ValidationError, model_validator
 
 # Default paths
 DEFAULT_CONFIG_PATH = "config.json"
@@ -23,6 +27,43 @@ def expand_path(path: str) -> str:
     """
     return os.path.expanduser(path)
 
+# Config entries holding filesystem paths, expanded once when the config is loaded
+_SECURITY_PATH_KEYS = ("tls_cert_path", "tls_key_path")
+_CONNECTION_PATH_KEYS = ("tls_cert_path", "macaroon_path", "socket_path")
+
+def expand_config_paths(config: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Expand ~ in the known path settings of a parsed config, in place.
+    
+    Args:
+        config: Configuration dictionary as parsed from the file
+    
+    Returns:
+        The same dictionary, for chaining
+    """
+    # Runs before validation, so sections of the wrong type are skipped here
+    # and reported by validate_config
+    if not isinstance(config, dict):
+        return config
+    
+    security = config.get("security")
+    if isinstance(security, dict):
+        for key in _SECURITY_PATH_KEYS:
+            if isinstance(security.get(key), str):
+                security[key] = expand_path(security[key])
+    
+    lightning = config.get("lightning")
+    connections = lightning.get("connection") if isinstance(lightning, dict) else None
+    if isinstance(connections, dict):
+        for connection in connections.values():
+            if not isinstance(connection, dict):
+                continue
+            for key in _CONNECTION_PATH_KEYS:
+                if isinstance(connection.get(key), str):
+                    connection[key] = expand_path(connection[key])
+    
+    return config
+
 def load_config(config_path: Optional[str] = None) -> Dict[str, Any]:
     """
     Load configuration from a JSON file.
@@ -32,28 +73,75 @@ def load_config(config_path: Optional[str] = None) -> Dict[str, Any]:
                     or default path
     
     Returns:
-        Dictionary containing configuration
+        Dictionary containing configuration, with ~ expanded in path settings
         
     Raises:
         FileNotFoundError: If the config file doesn't exist
-        json.JSONDecodeError: If the config file isn't valid JSON
+        orjson.JSONDecodeError: If the config file isn't valid JSON
     """
-    # Determine config path
-    if config_path is None:
-        config_path = os.environ.get(DEFAULT_CONFIG_ENV_VAR, DEFAULT_CONFIG_PATH)
-    
-    # Expand path if needed
-    config_path = expand_path(config_path)
+    # Determine config path, expanding ~ if needed
+    config_path = resolve_config_path(config_path)
     
     # Check if file exists
     if not os.path.isfile(config_path):
         raise FileNotFoundError(f"Configuration file not found: {config_path}")
     
     # Load and parse JSON
-    with open(config_path, 'r') as f:
-        config = json.load(f)
+    with open(config_path, 'rb') as f:
+        config = orjson.loads(f.read())
     
-    return config
+    return expand_config_paths(config)
+
+# Schema for the config file. Validation walks the whole document in one
+# pydantic-core pass; unknown keys are allowed so optional sections such as
+# "advanced" and extra connection settings pass through untouched. Strict
+# mode rejects values of the wrong JSON type (such as "port": "8080")
+# instead of coercing them, since the unvalidated dict is what gets used.
+class ServerConfig(BaseModel):
+    model_config = ConfigDict(extra="allow", strict=True)
+    
+    host: str
+    port: int
+
+class LNDConnectionConfig(BaseModel):
+    model_config = ConfigDict(extra="allow", strict=True)
+    
+    rpc_server: str
+    tls_cert_path: str
+    macaroon_path: str
+
+class LightningConfig(BaseModel):
+    model_config = ConfigDict(extra="allow", strict=True)
+    
+    implementation: Literal["lnd", "c-lightning", "eclair", "external"]
+    connection: Dict[str, Dict[str, Any]]
+    
+    @model_validator(mode="after")
+    def check_connection(self) -> "LightningConfig":
+        if self.implementation not in self.connection:
+            raise ValueError(f"Missing connection configuration for implementation: {self.implementation}")
+        if self.implementation == "lnd":
+            try:
+                LNDConnectionConfig.model_validate(self.connection["lnd"])
+            except ValidationError as e:
+                raise ValueError(f"Invalid LND connection configuration: {e}") from e
+        return self
+
+class AdvancedConfig(BaseModel):
+    model_config = ConfigDict(extra="allow", strict=True)
+    
+    # TTLs of the server's wallet balance and channel list caches
+    balance_cache_seconds: float = Field(default=2, ge=0)
+    channels_cache_seconds: float = Field(default=30, ge=0)
+
+class LightningMCPConfig(BaseModel):
+    model_config = ConfigDict(extra="allow", strict=True)
+    
+    server: ServerConfig
+    lightning: LightningConfig
+    security: Dict[str, Any]
+    payment_limits: Dict[str, Any]
+    advanced: Optional[AdvancedConfig] = None
 
 def validate_config(config: Dict[str, Any]) -> None:
     """
@@ -63,45 +151,40 @@ def validate_config(config: Dict[str, Any]) -> None:
         config: Configuration dictionary to validate
         
     Raises:
-        ValueError: If configuration is missing required fields
+        ValueError: If configuration is missing required fields (a
+                    pydantic.ValidationError listing every problem found)
     """
-    # Check for required top-level sections
-    required_sections = ["server", "lightning", "security", "payment_limits"]
-    for section in required_sections:
-        if section not in config:
-            raise ValueError(f"Missing required configuration section: {section}")
-    
-    # Check server section
-    required_server_fields = ["host", "port"]
-    for field in required_server_fields:
-        if field not in config["server"]:
-            raise ValueError(f"Missing required server configuration field: {field}")
-    
-    # Check lightning section
-    if "implementation" not in config["lightning"]:
-        raise ValueError("Missing required lightning configuration field: implementation")
-    
-    impl = config["lightning"]["implementation"]
-    if impl not in ["lnd", "c-lightning", "eclair", "external"]:
-        raise ValueError(f"Unsupported lightning implementation: {impl}")
-    
-    if "connection" not in config["lightning"]:
-        raise ValueError("Missing required lightning configuration field: connection")
-    
-    if impl not in config["lightning"]["connection"]:
-        raise ValueError(f"Missing connection configuration for implementation: {impl}")
-    
-    # Implementation-specific validation
-    if impl == "lnd":
-        required_lnd_fields = ["rpc_server", "tls_cert_path", "macaroon_path"]
-        for field in required_lnd_fields:
-            if field not in config["lightning"]["connection"]["lnd"]:
-                raise ValueError(f"Missing required LND configuration field: {field}")
+    LightningMCPConfig.model_validate(config)
+
+def resolve_config_path(config_path: Optional[str] = None) -> str:
+    """
+    Resolve the config file path that load_config would read.
+    
+    Args:
+        config_path: Path to the config file, or None to use environment variable
+                    or default path
+    
+    Returns:
+        The expanded path as a string
+    """
+    if config_path is None:
+        config_path = os.environ.get(DEFAULT_CONFIG_ENV_VAR, DEFAULT_CONFIG_PATH)
+    return expand_path(config_path)
+
+@lru_cache(maxsize=8)
+def _get_validated_config(config_path: str) -> Dict[str, Any]:
+    config = load_config(config_path)
+    validate_config(config)
+    return config
 
 def get_config_with_validation(config_path: Optional[str] = None) -> Dict[str, Any]:
     """
     Load and validate configuration.
     
+    The file is read and validated once per resolved path; each call returns
+    its own copy of the cached result, so callers may modify it. Call
+    clear_config_cache() after changing the file on disk.
+    
     Args:
         config_path: Path to the config file, or None to use environment variable
                     or default path
@@ -111,9 +194,11 @@ def get_config_with_validation(config_path: Optional[str] = None) -> Dict[str, A
         
     Raises:
         FileNotFoundError: If the config file doesn't exist
-        json.JSONDecodeError: If the config file isn't valid JSON
+        orjson.JSONDecodeError: If the config file isn't valid JSON
         ValueError: If configuration is missing required fields
     """
-    config = load_config(config_path)
-    validate_config(config)
-    return config 
\ No newline at end of file
+    return copy.deepcopy(_get_validated_config(resolve_config_path(config_path)))
+
+def clear_config_cache() -> None:
+    """Forget every config loaded by get_config_with_validation."""
+    _get_validated_config.cache_clear()
@@ -0,0 +1,42 @@
+#!/usr/bin/env python
+"""
+Helpers shared by the placeholder implementations of the Lightning clients.
+"""
+import re
+import time
+
+# Amount prefix of the placeholder BOLT11 strings produced by create_invoice
+LNBC_RE = re.compile(r"lnbc(\d+)p1")
+
+# Simulated payment statuses and their cumulative weights (80% / 10% / 10%)
+STATUSES = ("SUCCEEDED", "FAILED", "IN_FLIGHT")
+STATUS_CUMS = (0.8, 0.9, 1.0)
+
+# Channel fields returned by list_channels, in order
+CHANNEL_FIELDS = (
+    "active",
+    "remote_pubkey",
+    "channel_point",
+    "chan_id",
+    "capacity",
+    "local_balance",
+    "remote_balance",
+    "commit_fee",
+    "private",
+)
+
+def now() -> int:
+    """Current Unix time in whole seconds, without a float round-trip."""
+    return time.time_ns() // 1_000_000_000
+
+def simulated_status(r: float) -> str:
+    """
+    Pick a simulated payment status.
+
+    Args:
+        r: Uniform random number in [0, 1)
+
+    Returns:
+        One of STATUSES, weighted by STATUS_CUMS
+    """
+    return STATUSES[0 if r < STATUS_CUMS[0] else 1 if r < STATUS_CUMS[1] else 2]
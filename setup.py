@@ -24,8 +24,10 @@ setup(
         "grpcio>=1.54.0",  # gRPC for LND communication
         "grpcio-tools>=1.54.0",  # Tools for generating gRPC stubs
         "pydantic>=2.0.0",  # Data validation
+        "orjson>=3.9.0",  # Fast JSON serialization
         "fastapi>=0.100.0",  # REST API (optional)
-        "uvicorn>=0.22.0",  # ASGI server (for FastAPI)
+        "uvicorn[standard]>=0.22.0",  # ASGI server, with httptools and uvloop
+        "uvloop>=0.17.0; sys_platform != 'win32'",  # Faster asyncio event loop
         "python-dotenv>=1.0.0",  # Environment variable management
         "cryptography>=41.0.0",  # For TLS/SSL handling
     ],